@@ -9,12 +9,15 @@ setup(name='tap-outbrain',
       author='Fishtown Analytics',
       url='http://singer.io',
       classifiers=['Programming Language :: Python :: 3 :: Only'],
+      python_requires='>=3.8',
       py_modules=['tap_outbrain'],
       install_requires=[
           'singer-python==5.4.1',
           'backoff==1.3.2',
           'requests==2.20.0',
-          'python-dateutil==2.6.0'
+          'python-dateutil==2.6.0',
+          'ciso8601==2.3.1',
+          'orjson==3.9.10'
       ],
       entry_points='''
           [console_scripts]
@@ -4,28 +4,45 @@ from decimal import Decimal
 
 import argparse
 import base64
+import collections
+import concurrent.futures
+import contextlib
 import copy
 import datetime
-import json
+import functools
+import io
 import os
 import sys
+import threading
 import time
 import dateutil.parser
 
 import backoff
+import orjson
 import requests
 import singer
 import singer.requests
 from singer import utils
 
+try:
+    import ciso8601
+except ImportError:
+    ciso8601 = None
+
 import tap_outbrain.schemas as schemas
 
 schemas = schemas.structure
 LOGGER = singer.get_logger()
 SESSION = requests.Session()
+# singer.write_* print to stdout and the state map is shared, so both are
+# guarded when campaign performance is synced from worker threads.
+WRITE_LOCK = threading.Lock()
 
 BASE_URL = 'https://api.outbrain.com/amplify/v0.1'
 CONFIG = {}
+# Plain schema dicts by tap_stream_id, filled by discover() when the catalog
+# is discovered in-process rather than passed with --catalog.
+DISCOVERED_SCHEMAS = {}
 
 DEFAULT_STATE = {
     'campaign_performance': {}
@@ -44,9 +61,97 @@ DEFAULT_START_DATE = '2016-08-01'
 # 660) campaigns.
 TAP_CAMPAIGN_COUNT_ERROR_CEILING = 660
 MARKETERS_CAMPAIGNS_MAX_LIMIT = 50
+# Maximum number of campaign pages requested concurrently in the
+# background once the total campaign count is known.
+CAMPAIGN_PAGE_CONCURRENCY = 8
 # This is an arbitrary limit and can be tuned later down the road if we
 # see need for it. (Tested with 200 at least)
 REPORTS_MARKETERS_PERIODIC_MAX_LIMIT = 500
+# Metrics copied from each periodic report row, in output order, with the
+# type they are cast to.
+PERFORMANCE_METRICS = (
+    ('impressions', int),
+    ('clicks', int),
+    ('ctr', float),
+    ('spend', float),
+    ('ecpc', float),
+    ('conversions', int),
+    ('conversionRate', float),
+    ('cpa', float),
+)
+# Records are written in batches, so stdout is only flushed with state
+# messages instead of after every record.
+STDOUT_BUFFER_SIZE = 64 * 1024
+# Reporting requests from all workers share one rate limiter, so more than
+# two workers only helps to overlap response processing.
+DEFAULT_MAX_WORKERS = 2
+
+
+class RateLimiter:
+    """
+    Blocks callers so that at most `rate` calls to `acquire` are let through
+    within any `per` second window, across all threads.
+
+    `clock` and `sleep` default to `time.monotonic` and `time.sleep`.
+    """
+
+    def __init__(self, rate, per, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.per = per
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._calls = collections.deque()
+
+    def acquire(self):
+        """
+        Waits for a free slot and returns the clock time it was taken at.
+        """
+        with self._lock:
+            now = self._clock()
+            while self._calls and now - self._calls[0] >= self.per:
+                self._calls.popleft()
+
+            if len(self._calls) >= self.rate:
+                to_sleep = self.per - (now - self._calls.popleft())
+                LOGGER.info(
+                    'Limiting to {} requests per {} sec. Sleeping {} sec '
+                    'before making the next reporting request.'
+                        .format(self.rate, self.per, to_sleep))
+                self._sleep(to_sleep)
+
+            taken_at = self._clock()
+            self._calls.append(taken_at)
+
+        return taken_at
+
+
+# Outbrain allows 2 reporting requests per minute.
+PERFORMANCE_RATE_LIMITER = RateLimiter(rate=2, per=60.0)
+
+
+def configure_session():
+    # Size the connection pool for the campaign workers so concurrent
+    # requests reuse keep-alive connections instead of discarding them.
+    # Retries are left to backoff in `request`.
+    max_workers = int(CONFIG.get('max_workers', DEFAULT_MAX_WORKERS))
+    # Each worker may have a prefetched report in flight, and campaign
+    # pages are fetched concurrently as well.
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=max_workers,
+        pool_maxsize=max_workers * 2 + CAMPAIGN_PAGE_CONCURRENCY,
+        max_retries=0)
+    SESSION.mount('https://', adapter)
+    SESSION.mount('http://', adapter)
+    SESSION.headers['Connection'] = 'keep-alive'
+
+
+def get_headers(access_token):
+    headers = {'OB-TOKEN-V1': access_token}
+    if 'user_agent' in CONFIG:
+        headers['User-Agent'] = CONFIG['user_agent']
+
+    return headers
 
 
 @backoff.on_exception(backoff.constant,
@@ -55,18 +160,20 @@ REPORTS_MARKETERS_PERIODIC_MAX_LIMIT = 500
                       max_tries=5,
                       giveup=singer.requests.giveup_on_http_4xx_except_429,
                       interval=30)
-def request(url, access_token, params):
+def request(url, access_token, params, rate_limiter=None):
+    # the limiter is acquired inside the backoff wrapper so that retries,
+    # e.g. after a 429, also wait for a slot
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+
     LOGGER.info("Making request: GET {} {}".format(url, params))
-    headers = {'OB-TOKEN-V1': access_token}
-    if 'user_agent' in CONFIG:
-        headers['User-Agent'] = CONFIG['user_agent']
+    headers = get_headers(access_token)
 
-    req = requests.Request('GET', url, headers=headers, params=params).prepare()
-    LOGGER.info("GET {}".format(req.url))
-    resp = SESSION.send(req)
+    resp = SESSION.get(url, headers=headers, params=params)
+    LOGGER.info("GET {}".format(resp.request.url))
 
     if resp.status_code >= 400:
-        LOGGER.error("GET {} [{} - {}]".format(req.url, resp.status_code, resp.content))
+        LOGGER.error("GET {} [{} - {}]".format(resp.request.url, resp.status_code, resp.content))
         resp.raise_for_status()
 
     return resp
@@ -83,28 +190,58 @@ def generate_token(username, password):
     return response.json().get('OB-TOKEN-V1')
 
 
+def parse_iso_datetime(date_time):
+    if ciso8601 is not None:
+        return ciso8601.parse_datetime(date_time)
+
+    if date_time.endswith('Z'):
+        date_time = date_time[:-1] + '+00:00'
+
+    return datetime.datetime.fromisoformat(date_time)
+
+
+@functools.lru_cache(maxsize=8192)
 def parse_datetime(date_time):
-    parsed_datetime = dateutil.parser.parse(date_time)
+    # Outbrain returns ISO-8601 timestamps, so try the fast ISO parser first
+    # and only fall back to dateutil for anything it rejects.
+    try:
+        parsed_datetime = parse_iso_datetime(date_time)
+    except ValueError:
+        parsed_datetime = dateutil.parser.parse(date_time)
+
+    if parsed_datetime.tzinfo is not None:
+        parsed_datetime = parsed_datetime.astimezone(
+            datetime.timezone.utc).replace(tzinfo=None)
 
     # the assumption is that the timestamp comes in in UTC
     return parsed_datetime.isoformat('T') + 'Z'
 
 
+def parse_date(date):
+    # bookmarks and the start date are always stored as YYYY-MM-DD
+    return datetime.date(int(date[:4]), int(date[5:7]), int(date[8:10]))
+
+
+def write_records(stream_name, records, time_extracted):
+    # Same messages as singer.write_record, serialized with orjson and
+    # written in one go without a flush. The next singer.write_state
+    # flushes the batch.
+    sys.stdout.write(b''.join(
+        orjson.dumps(singer.RecordMessage(
+            stream=stream_name,
+            record=record,
+            time_extracted=time_extracted).asdict()) + b'\n'
+        for record in records).decode('utf-8'))
+
+
 def parse_performance(result, extra_fields):
-    metrics = result.get('metrics', {})
-    metadata = result.get('metadata', {})
-
-    to_return = {
-        'fromDate': metadata.get('fromDate'),
-        'impressions': int(metrics.get('impressions', 0)),
-        'clicks': int(metrics.get('clicks', 0)),
-        'ctr': float(metrics.get('ctr', 0.0)),
-        'spend': float(metrics.get('spend', 0.0)),
-        'ecpc': float(metrics.get('ecpc', 0.0)),
-        'conversions': int(metrics.get('conversions', 0)),
-        'conversionRate': float(metrics.get('conversionRate', 0.0)),
-        'cpa': float(metrics.get('cpa', 0.0)),
-    }
+    metrics = result.get('metrics') or {}
+    metadata = result.get('metadata') or {}
+
+    to_return = {'fromDate': metadata.get('fromDate')}
+    to_return.update(
+        (name, cast(metrics.get(name, 0)))
+        for name, cast in PERFORMANCE_METRICS)
     to_return.update(extra_fields)
 
     return to_return
@@ -112,23 +249,19 @@ def parse_performance(result, extra_fields):
 
 def get_date_ranges(start, end, interval_in_days):
     if start > end:
-        return []
-
-    to_return = []
-    interval_start = start
+        return
 
-    while interval_start < end:
-        to_return.append({
-            'from_date': interval_start,
-            'to_date': min(end,
-                           (interval_start + datetime.timedelta(
-                               days=interval_in_days - 1)))
-        })
+    interval_start = start.toordinal()
+    last = end.toordinal()
 
-        interval_start = interval_start + datetime.timedelta(
-            days=interval_in_days)
+    while interval_start < last:
+        yield {
+            'from_date': datetime.date.fromordinal(interval_start),
+            'to_date': datetime.date.fromordinal(
+                min(last, interval_start + interval_in_days - 1))
+        }
 
-    return to_return
+        interval_start += interval_in_days
 
 
 def sync_campaign_performance(state, access_token, account_id, campaign_id):
@@ -142,6 +275,58 @@ def sync_campaign_performance(state, access_token, account_id, campaign_id):
         {'campaignId': campaign_id})
 
 
+def request_performance(account_id, access_token, params):
+    last_request_start = utils.now()
+    response = orjson.loads(request(
+        '{}/reports/marketers/{}/periodic'.format(BASE_URL, account_id),
+        access_token,
+        params,
+        rate_limiter=PERFORMANCE_RATE_LIMITER).content)
+    last_request_end = utils.now()
+
+    LOGGER.info('Done in {} sec'.format(
+        last_request_end.timestamp() - last_request_start.timestamp()))
+
+    return response, last_request_end
+
+
+# Marks the end of the items passed to prefetch, which may include None.
+_END = object()
+
+
+def prefetch(func, items):
+    """
+    Yields `(item, func(item))` for each of `items`. While the caller handles
+    one result, `func` already runs for the next item in a background
+    thread. Closing the generator cancels that call if it hasn't started
+    yet and never waits for it.
+    """
+    items = iter(items)
+    item = next(items, _END)
+    next_item = next(items, _END)
+
+    # nothing to overlap with, so don't start a thread
+    if next_item is _END:
+        if item is not _END:
+            yield item, func(item)
+        return
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(func, item)
+    try:
+        while item is not _END:
+            result = future.result()
+            current_item, item = item, next_item
+            if item is not _END:
+                future = executor.submit(func, item)
+                next_item = next(items, _END)
+
+            yield current_item, result
+    finally:
+        future.cancel()
+        executor.shutdown(wait=False)
+
+
 def sync_performance(state, access_token, account_id, table_name, state_sub_id,
                      extra_params, extra_persist_fields):
     """
@@ -166,10 +351,9 @@ def sync_performance(state, access_token, account_id, table_name, state_sub_id,
                                 {'campaignId': '000b...'}
     """
     # sync 2 days before last saved date, or DEFAULT_START_DATE
-    from_date = datetime.datetime.strptime(
+    from_date = parse_date(
         state.get(table_name, {})
-            .get(state_sub_id, DEFAULT_START_DATE),
-        '%Y-%m-%d').date() - datetime.timedelta(days=2)
+            .get(state_sub_id, DEFAULT_START_DATE)) - datetime.timedelta(days=2)
 
     to_date = datetime.date.today()
 
@@ -177,9 +361,15 @@ def sync_performance(state, access_token, account_id, table_name, state_sub_id,
 
     date_ranges = get_date_ranges(from_date, to_date, interval_in_days)
 
-    last_request_start = None
+    base_params = {
+        'breakdown': 'daily',
+        'limit': REPORTS_MARKETERS_PERIODIC_MAX_LIMIT,
+        'sort': '+fromDate',
+        'includeArchivedCampaigns': True,
+    }
+    base_params.update(extra_params)
 
-    for date_range in date_ranges:
+    def fetch(date_range):
         LOGGER.info(
             'Pulling {} for {} from {} to {}'
                 .format(table_name,
@@ -187,55 +377,50 @@ def sync_performance(state, access_token, account_id, table_name, state_sub_id,
                         date_range.get('from_date'),
                         date_range.get('to_date')))
 
-        params = {
-            'from': date_range.get('from_date'),
-            'to': date_range.get('to_date'),
-            'breakdown': 'daily',
-            'limit': REPORTS_MARKETERS_PERIODIC_MAX_LIMIT,
-            'sort': '+fromDate',
-            'includeArchivedCampaigns': True,
-        }
-        params.update(extra_params)
-
-        last_request_start = utils.now()
-        response = request(
-            '{}/reports/marketers/{}/periodic'.format(BASE_URL, account_id),
-            access_token,
-            params).json()
-        if REPORTS_MARKETERS_PERIODIC_MAX_LIMIT < response.get('totalResults'):
-            LOGGER.warn('More performance data (`{}`) than the tap can currently retrieve (`{}`)'.format(
-                response.get('totalResults'), REPORTS_MARKETERS_PERIODIC_MAX_LIMIT))
-        else:
-            LOGGER.info('Syncing `{}` rows of performance data for campaign `{}`. Requested `{}`.'.format(
-                response.get('totalResults'), state_sub_id, REPORTS_MARKETERS_PERIODIC_MAX_LIMIT))
-        last_request_end = utils.now()
+        params = {**base_params,
+                  'from': date_range['from_date'],
+                  'to': date_range['to_date']}
 
-        LOGGER.info('Done in {} sec'.format(
-            last_request_end.timestamp() - last_request_start.timestamp()))
+        return request_performance(account_id, access_token, params)
 
-        performance = [
-            parse_performance(result, extra_persist_fields)
-            for result in response.get('results')]
+    state_changed = False
 
-        for record in performance:
-            singer.write_record(table_name, record, time_extracted=last_request_end)
+    # Keep the request for the next date range in flight while the current
+    # response is parsed and written.
+    with contextlib.closing(prefetch(fetch, date_ranges)) as responses:
+        for date_range, (response, last_request_end) in responses:
+            if REPORTS_MARKETERS_PERIODIC_MAX_LIMIT < response.get('totalResults'):
+                LOGGER.warn('More performance data (`{}`) than the tap can currently retrieve (`{}`)'.format(
+                    response.get('totalResults'), REPORTS_MARKETERS_PERIODIC_MAX_LIMIT))
+            else:
+                LOGGER.info('Syncing `{}` rows of performance data for campaign `{}`. Requested `{}`.'.format(
+                    response.get('totalResults'), state_sub_id, REPORTS_MARKETERS_PERIODIC_MAX_LIMIT))
 
-        last_record = performance[-1]
-        new_from_date = last_record.get('fromDate')
+            performance = [
+                parse_performance(result, extra_persist_fields)
+                for result in response.get('results') or []]
 
-        state[table_name][state_sub_id] = new_from_date
-        singer.write_state(state)
+            if not performance:
+                LOGGER.info('No rows of {} for {} from {} to {}'.format(
+                    table_name,
+                    extra_persist_fields,
+                    date_range.get('from_date'),
+                    date_range.get('to_date')))
+                continue
 
-        from_date = new_from_date
+            last_record = performance[-1]
+            new_from_date = last_record.get('fromDate')
 
-        if last_request_start is not None and \
-                (time.time() - last_request_end.timestamp()) < 30:
-            to_sleep = 30 - (time.time() - last_request_end.timestamp())
-            LOGGER.info(
-                'Limiting to 2 requests per minute. Sleeping {} sec '
-                'before making the next reporting request.'
-                    .format(to_sleep))
-            time.sleep(to_sleep)
+            # the state map is only serialized once all date ranges of this
+            # sub-object are synced, see below
+            with WRITE_LOCK:
+                write_records(table_name, performance, last_request_end)
+                state[table_name][state_sub_id] = new_from_date
+            state_changed = True
+
+    if state_changed:
+        with WRITE_LOCK:
+            singer.write_state(state)
 
 
 def parse_campaign(campaign):
@@ -251,48 +436,64 @@ def parse_campaign(campaign):
 def get_campaigns_page(account_id, access_token, offset):
     # NOTE: We probably should be more aggressive about ensuring that the
     # response was successful.
-    return request(
+    return orjson.loads(request(
         '{}/marketers/{}/campaigns'.format(BASE_URL, account_id),
         access_token, {'limit': MARKETERS_CAMPAIGNS_MAX_LIMIT,
-                       'offset': offset}).json()
+                       'offset': offset}).content)
 
 
 def get_campaign_pages(account_id, access_token):
-    more_campaigns = True
-    offset = 0
-
-    while more_campaigns:
-        LOGGER.info('Retrieving campaigns from offset `{}`'.format(
-            offset))
-        campaign_page = get_campaigns_page(account_id, access_token,
-                                           offset)
-        if TAP_CAMPAIGN_COUNT_ERROR_CEILING < campaign_page.get('totalCount'):
-            msg = 'Tap found `{}` campaigns which is more than can be retrieved in the alloted time (`{}`).'.format(
-                campaign_page.get('totalCount'), TAP_CAMPAIGN_COUNT_ERROR_CEILING)
-            LOGGER.error(msg)
-            raise Exception(msg)
-        LOGGER.info('Retrieved offset `{}` campaigns out of `{}`'.format(
-            offset, campaign_page.get('totalCount')))
+    LOGGER.info('Retrieving campaigns from offset `0`')
+    campaign_page = get_campaigns_page(account_id, access_token, 0)
+    total_count = campaign_page.get('totalCount')
+    if TAP_CAMPAIGN_COUNT_ERROR_CEILING < total_count:
+        msg = 'Tap found `{}` campaigns which is more than can be retrieved in the alloted time (`{}`).'.format(
+            total_count, TAP_CAMPAIGN_COUNT_ERROR_CEILING)
+        LOGGER.error(msg)
+        raise Exception(msg)
+    LOGGER.info('Retrieved offset `0` campaigns out of `{}`'.format(
+        total_count))
+
+    # The remaining offsets are known from the first page, so request them
+    # in the background while the caller syncs the first page.
+    offsets = range(MARKETERS_CAMPAIGNS_MAX_LIMIT, total_count,
+                    MARKETERS_CAMPAIGNS_MAX_LIMIT)
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=CAMPAIGN_PAGE_CONCURRENCY)
+    futures = [executor.submit(get_campaigns_page, account_id, access_token,
+                               offset)
+               for offset in offsets]
+    try:
         yield campaign_page
-        if (offset + MARKETERS_CAMPAIGNS_MAX_LIMIT) < campaign_page.get('totalCount'):
-            offset += MARKETERS_CAMPAIGNS_MAX_LIMIT
-        else:
-            more_campaigns = False
 
-    LOGGER.info('Finished retrieving `{}` campaigns'.format(
-        campaign_page.get('totalCount')))
+        for offset, future in zip(offsets, futures):
+            campaign_page = future.result()
+            LOGGER.info('Retrieved offset `{}` campaigns out of `{}`'.format(
+                offset, total_count))
+            yield campaign_page
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+    LOGGER.info('Finished retrieving `{}` campaigns'.format(total_count))
 
 
 def sync_campaign_page(state, access_token, account_id, campaign_page, selected_stream_ids):
     campaigns = [parse_campaign(campaign) for campaign
                  in campaign_page.get('campaigns', [])]
 
-    for campaign in campaigns:
-        singer.write_record('campaign', campaign,
-                            time_extracted=utils.now())
-        if "campaign_performance" in selected_stream_ids:
-            sync_campaign_performance(state, access_token, account_id,
-                                      campaign.get('id'))
+    with WRITE_LOCK:
+        write_records('campaign', campaigns, utils.now())
+
+    if "campaign_performance" in selected_stream_ids:
+        max_workers = int(CONFIG.get('max_workers', DEFAULT_MAX_WORKERS))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # consume the results so exceptions from workers are re-raised
+            list(executor.map(
+                lambda campaign: sync_campaign_performance(
+                    state, access_token, account_id, campaign.get('id')),
+                campaigns))
 
 
 def sync_campaigns(state, access_token, account_id, selected_stream_ids):
@@ -313,10 +514,13 @@ def get_selected_streams(catalog: singer.Catalog) -> list:
     selected_streams = list()
 
     for stream in catalog.streams:
-        stream_metadata = singer.metadata.to_map(stream.metadata)
-        # stream metadata will have an empty breadcrumb
-        if singer.metadata.get(stream_metadata, (), "selected"):
-            selected_streams.append(stream.tap_stream_id)
+        for entry in stream.metadata:
+            # stream metadata will have an empty breadcrumb; it is a list
+            # when read from JSON, so don't compare against ()
+            if not entry.get('breadcrumb'):
+                if entry.get('metadata', {}).get('selected'):
+                    selected_streams.append(stream.tap_stream_id)
+                break
 
     return selected_streams
 
@@ -328,6 +532,7 @@ def do_sync(args, catalog: singer.Catalog):
 
     config = args.config
     CONFIG.update(config)
+    configure_session()
 
     missing_keys = []
     if 'account_id' not in config:
@@ -372,7 +577,8 @@ def do_sync(args, catalog: singer.Catalog):
         LOGGER.info('Syncing ' + stream_id)
 
         singer.write_schema(stream_id,
-                            schema=stream.schema.to_dict(),
+                            schema=(DISCOVERED_SCHEMAS.get(stream_id)
+                                    or stream.schema.to_dict()),
                             key_properties=["id"],
                             bookmark_properties=["fromDate"])
         api_func_map(stream_id)(state, access_token, account_id, selected_stream_ids)
@@ -391,7 +597,6 @@ def discover() -> singer.Catalog:
     Discover catalog of schemas ie. reporting cube definitions
     """
 
-    metadata = dict()
     # Disable key properties to avoid file-not-found errors because these aren't used
     # key_properties = load_key_properties()
     key_properties = dict()
@@ -401,13 +606,13 @@ def discover() -> singer.Catalog:
     # Build catalog by iterating over schemas
     for name in schemas:
         schema_name = name
-        metadata = schemas[name]["metadata"]
-        schema = singer.Schema.from_dict(data=schemas[name])
-        stream_metadata = list()
-        stream_key_properties = list()
-
-        stream_metadata.extend(metadata)
-        stream_key_properties.extend(key_properties.get(schema_name, list()))
+        # keep the plain schema dict around so do_sync doesn't have to
+        # rebuild it with schema.to_dict(), see DISCOVERED_SCHEMAS
+        schema_dict = {key: value for key, value in schemas[name].items()
+                       if key not in ('name', 'metadata')}
+        schema = singer.Schema.from_dict(data=schema_dict)
+        stream_metadata = list(schemas[name]["metadata"])
+        stream_key_properties = list(key_properties.get(schema_name, ()))
 
         # Create catalog entry
         catalog_entry = singer.catalog.CatalogEntry()
@@ -417,6 +622,7 @@ def discover() -> singer.Catalog:
         catalog_entry.schema = schema
         catalog_entry.metadata = stream_metadata
         catalog_entry.key_properties = stream_key_properties
+        DISCOVERED_SCHEMAS[schema_name] = schema_dict
 
         streams.append(catalog_entry)
     return singer.Catalog(streams)
@@ -428,18 +634,62 @@ def check_auth(config):
 
 
 
+def buffer_stdout():
+    """
+    Replaces sys.stdout with a larger, non line buffered UTF-8 writer and
+    returns the original stream. The writer sits on the raw stream below
+    stdout's own buffer when there is one, so that a flush reaches the
+    target. Streams without a binary buffer, e.g. captured text output, are
+    left alone.
+    """
+    stdout = sys.stdout
+    if not hasattr(stdout, 'buffer'):
+        return stdout
+
+    stdout.flush()
+    raw = getattr(stdout.buffer, 'raw', None)
+    if raw is not None:
+        buffer = io.BufferedWriter(raw, buffer_size=STDOUT_BUFFER_SIZE)
+    else:
+        buffer = stdout.buffer
+
+    sys.stdout = io.TextIOWrapper(
+        buffer,
+        encoding='utf-8',
+        write_through=False,
+        line_buffering=False)
+
+    return stdout
+
+
+def restore_stdout(stdout):
+    if sys.stdout is stdout:
+        return
+
+    # detach rather than close so the original stream stays usable
+    buffer = sys.stdout.detach()
+    if buffer is not stdout.buffer:
+        buffer.detach()
+    sys.stdout = stdout
+
+
 def main_impl():
     args = singer.utils.parse_args(REQUIRED_CONFIG_KEYS)
-    if args.discover:
-        check_auth(args.config)
-        catalog = discover()
-        print(json.dumps(catalog.to_dict(), indent=2))
-    else:
-        if args.catalog:
-            catalog = args.catalog
-        else:
+    stdout = buffer_stdout()
+    try:
+        if args.discover:
+            check_auth(args.config)
             catalog = discover()
-        do_sync(args, catalog)
+            print(orjson.dumps(catalog.to_dict(),
+                               option=orjson.OPT_INDENT_2).decode('utf-8'))
+        else:
+            if args.catalog:
+                catalog = args.catalog
+            else:
+                catalog = discover()
+            do_sync(args, catalog)
+    finally:
+        restore_stdout(stdout)
 
 
 def main():
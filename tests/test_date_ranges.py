@@ -0,0 +1,47 @@
+import datetime
+import unittest
+
+import tap_outbrain
+
+
+def date_ranges(start, end, interval_in_days):
+    return [(date_range['from_date'], date_range['to_date'])
+            for date_range in tap_outbrain.get_date_ranges(
+                start, end, interval_in_days)]
+
+
+class TestGetDateRanges(unittest.TestCase):
+
+    def test_start_after_end(self):
+        self.assertEqual(date_ranges(datetime.date(2020, 1, 2),
+                                     datetime.date(2020, 1, 1), 5), [])
+
+    def test_start_equals_end(self):
+        self.assertEqual(date_ranges(datetime.date(2020, 1, 1),
+                                     datetime.date(2020, 1, 1), 5), [])
+
+    def test_last_range_is_cut_at_end(self):
+        self.assertEqual(
+            date_ranges(datetime.date(2020, 1, 1),
+                        datetime.date(2020, 1, 8), 5),
+            [(datetime.date(2020, 1, 1), datetime.date(2020, 1, 5)),
+             (datetime.date(2020, 1, 6), datetime.date(2020, 1, 8))])
+
+    def test_no_range_starts_on_end(self):
+        # start + 2 * interval == end: the end date does not open a range
+        self.assertEqual(
+            date_ranges(datetime.date(2020, 1, 1),
+                        datetime.date(2020, 1, 11), 5),
+            [(datetime.date(2020, 1, 1), datetime.date(2020, 1, 5)),
+             (datetime.date(2020, 1, 6), datetime.date(2020, 1, 10))])
+
+    def test_ranges_cross_month_and_year_boundaries(self):
+        self.assertEqual(
+            date_ranges(datetime.date(2019, 12, 30),
+                        datetime.date(2020, 1, 3), 3),
+            [(datetime.date(2019, 12, 30), datetime.date(2020, 1, 1)),
+             (datetime.date(2020, 1, 2), datetime.date(2020, 1, 3))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from unittest import mock
+
+import tap_outbrain
+
+
+class ParseDatetimeTests:
+    """
+    Shared cases, run once with whichever ISO parser is installed and once
+    with the datetime.fromisoformat fallback.
+    """
+
+    def setUp(self):
+        tap_outbrain.parse_datetime.cache_clear()
+        self.addCleanup(tap_outbrain.parse_datetime.cache_clear)
+
+    def test_naive_input_is_taken_as_utc(self):
+        self.assertEqual(tap_outbrain.parse_datetime('2013-03-16 10:32:31'),
+                         '2013-03-16T10:32:31Z')
+
+    def test_z_input(self):
+        self.assertEqual(tap_outbrain.parse_datetime('2013-03-16T10:32:31Z'),
+                         '2013-03-16T10:32:31Z')
+
+    def test_offset_input_is_converted_to_utc(self):
+        self.assertEqual(
+            tap_outbrain.parse_datetime('2013-03-16T10:06:35.123+02:00'),
+            '2013-03-16T08:06:35.123000Z')
+
+    def test_iso_input_does_not_use_dateutil(self):
+        with mock.patch('dateutil.parser.parse') as parse:
+            tap_outbrain.parse_datetime('2013-03-16T10:32:31Z')
+            tap_outbrain.parse_datetime('2013-03-16T10:06:35.123+02:00')
+
+        parse.assert_not_called()
+
+    def test_non_iso_input_falls_back_to_dateutil(self):
+        self.assertEqual(tap_outbrain.parse_datetime('Mar 16 2013 10:32'),
+                         '2013-03-16T10:32:00Z')
+
+    def test_repeated_timestamps_are_served_from_the_cache(self):
+        tap_outbrain.parse_datetime('2013-03-16T10:32:31Z')
+        tap_outbrain.parse_datetime('2013-03-16T10:32:31Z')
+
+        cache_info = tap_outbrain.parse_datetime.cache_info()
+        self.assertEqual((cache_info.hits, cache_info.misses), (1, 1))
+
+
+@unittest.skipIf(tap_outbrain.ciso8601 is None, 'ciso8601 is not installed')
+class TestParseDatetimeCiso8601(ParseDatetimeTests, unittest.TestCase):
+    pass
+
+
+class TestParseDatetimeFromIsoformat(ParseDatetimeTests, unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(tap_outbrain, 'ciso8601', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import tap_outbrain
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def test_yields_results_in_order(self):
+        results = list(tap_outbrain.prefetch(lambda item: item * 2, [1, 2, 3]))
+
+        self.assertEqual(results, [(1, 2), (2, 4), (3, 6)])
+
+    def test_single_item_runs_without_a_thread(self):
+        with mock.patch('concurrent.futures.ThreadPoolExecutor') as executor:
+            results = list(tap_outbrain.prefetch(lambda item: item, ['only']))
+
+        self.assertEqual(results, [('only', 'only')])
+        executor.assert_not_called()
+
+    def test_none_items_do_not_end_the_sequence(self):
+        results = list(tap_outbrain.prefetch(lambda item: item, [1, None, 3]))
+
+        self.assertEqual(results, [(1, 1), (None, None), (3, 3)])
+
+    def test_leading_none_item(self):
+        results = list(tap_outbrain.prefetch(lambda item: item, [None, 2]))
+
+        self.assertEqual(results, [(None, None), (2, 2)])
+
+    def test_no_items(self):
+        self.assertEqual(list(tap_outbrain.prefetch(lambda item: item, [])), [])
+
+    def test_closing_does_not_wait_for_the_prefetched_call(self):
+        release = threading.Event()
+
+        def func(item):
+            if item == 2:
+                release.wait(5)
+            return item
+
+        responses = tap_outbrain.prefetch(func, [1, 2])
+        try:
+            self.assertEqual(next(responses), (1, 1))
+
+            started = time.monotonic()
+            responses.close()
+            self.assertLess(time.monotonic() - started, 1)
+        finally:
+            release.set()
+
+
+if __name__ == '__main__':
+    unittest.main()
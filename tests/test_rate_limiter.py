@@ -0,0 +1,81 @@
+import threading
+import unittest
+from unittest import mock
+
+import requests
+
+import tap_outbrain
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_at_most_rate_acquisitions_per_window_across_threads(self):
+        clock = FakeClock()
+        limiter = tap_outbrain.RateLimiter(rate=2, per=60.0,
+                                           clock=clock, sleep=clock.sleep)
+        taken_at = []
+        taken_at_lock = threading.Lock()
+
+        def acquire():
+            slot = limiter.acquire()
+            with taken_at_lock:
+                taken_at.append(slot)
+
+        threads = [threading.Thread(target=acquire) for _ in range(7)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        taken_at.sort()
+        self.assertEqual(len(taken_at), 7)
+        for earlier, later in zip(taken_at, taken_at[limiter.rate:]):
+            self.assertGreaterEqual(later - earlier, limiter.per)
+        # 7 calls at 2 per window need exactly 3 full windows of waiting
+        self.assertEqual(taken_at[-1], 180.0)
+
+    def test_does_not_wait_while_budget_is_left(self):
+        clock = FakeClock()
+        limiter = tap_outbrain.RateLimiter(rate=2, per=60.0,
+                                           clock=clock, sleep=clock.sleep)
+
+        self.assertEqual(limiter.acquire(), 0.0)
+        clock.now = 10.0
+        self.assertEqual(limiter.acquire(), 10.0)
+        clock.now = 70.0
+        # the first slot expired at 60, so this call goes straight through
+        self.assertEqual(limiter.acquire(), 70.0)
+
+
+class TestRequestRateLimiting(unittest.TestCase):
+
+    @mock.patch('time.sleep')
+    def test_every_attempt_acquires_the_rate_limiter(self, _sleep):
+        too_many_requests = mock.Mock(status_code=429)
+        too_many_requests.raise_for_status.side_effect = \
+            requests.exceptions.HTTPError(response=too_many_requests)
+        ok = mock.Mock(status_code=200)
+        limiter = mock.Mock()
+
+        with mock.patch.object(tap_outbrain.SESSION, 'get',
+                               side_effect=[too_many_requests, ok]):
+            resp = tap_outbrain.request('http://localhost', 'token', {},
+                                        rate_limiter=limiter)
+
+        self.assertIs(resp, ok)
+        self.assertEqual(limiter.acquire.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
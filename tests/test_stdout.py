@@ -0,0 +1,64 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import singer
+
+import tap_outbrain
+
+
+class TestBufferStdout(unittest.TestCase):
+
+    def test_restores_the_original_stream_and_keeps_it_open(self):
+        raw = io.BytesIO()
+        stdout = io.TextIOWrapper(raw, encoding='utf-8')
+
+        with mock.patch.object(sys, 'stdout', stdout):
+            for _ in range(2):
+                original = tap_outbrain.buffer_stdout()
+                self.assertIsNot(sys.stdout, stdout)
+                sys.stdout.write('{"type": "STATE"}\n')
+                tap_outbrain.restore_stdout(original)
+
+                self.assertIs(sys.stdout, stdout)
+
+        self.assertFalse(stdout.closed)
+        self.assertEqual(raw.getvalue(), b'{"type": "STATE"}\n' * 2)
+
+    def test_state_reaches_the_file_before_restore(self):
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        stdout = io.TextIOWrapper(io.BufferedWriter(io.FileIO(fd, 'w')),
+                                  encoding='utf-8')
+        self.addCleanup(stdout.close)
+
+        with mock.patch.object(sys, 'stdout', stdout):
+            original = tap_outbrain.buffer_stdout()
+            try:
+                tap_outbrain.write_records('campaign', [{'id': '1'}], None)
+                singer.write_state({'campaign_performance': {'1': '2020-01-01'}})
+
+                with open(path, 'rb') as written:
+                    lines = written.read().splitlines()
+            finally:
+                tap_outbrain.restore_stdout(original)
+
+        self.assertEqual(len(lines), 2)
+        self.assertIn(b'"type":"RECORD"', lines[0])
+        self.assertIn(b'"type": "STATE"', lines[1])
+
+    def test_leaves_streams_without_a_buffer_alone(self):
+        stdout = io.StringIO()
+
+        with mock.patch.object(sys, 'stdout', stdout):
+            original = tap_outbrain.buffer_stdout()
+            self.assertIs(sys.stdout, stdout)
+            tap_outbrain.restore_stdout(original)
+            self.assertIs(sys.stdout, stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
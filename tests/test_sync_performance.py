@@ -0,0 +1,66 @@
+import datetime
+import io
+import json
+import sys
+import unittest
+from unittest import mock
+
+import tap_outbrain
+
+
+def fake_request_performance(account_id, access_token, params):
+    response = {
+        'totalResults': 1,
+        'results': [{
+            'metrics': {'impressions': 1},
+            'metadata': {'fromDate': params['from'].isoformat()},
+        }],
+    }
+    return response, datetime.datetime.now(datetime.timezone.utc)
+
+
+@mock.patch.object(tap_outbrain, 'REPORTS_MARKETERS_PERIODIC_MAX_LIMIT', 5)
+@mock.patch.object(tap_outbrain, 'request_performance',
+                   side_effect=fake_request_performance)
+class TestSyncPerformanceState(unittest.TestCase):
+
+    def sync_campaigns(self, campaign_ids):
+        bookmark = (datetime.date.today()
+                    - datetime.timedelta(days=10)).isoformat()
+        state = {'campaign_performance': {
+            campaign_id: bookmark for campaign_id in campaign_ids}}
+        campaign_page = {'campaigns': [{'id': campaign_id}
+                                       for campaign_id in campaign_ids]}
+
+        stdout = io.StringIO()
+        with mock.patch.object(sys, 'stdout', stdout), \
+                mock.patch.dict(tap_outbrain.CONFIG, {'max_workers': 1}):
+            tap_outbrain.sync_campaign_page(
+                state, 'token', 'account', campaign_page,
+                ['campaign', 'campaign_performance'])
+
+        return state, [json.loads(line)
+                       for line in stdout.getvalue().splitlines()]
+
+    def test_one_state_per_campaign_after_its_records(self, request_performance):
+        state, messages = self.sync_campaigns(['c0', 'c1'])
+
+        # 12 days at 5 days per report is 3 date ranges per campaign
+        self.assertEqual(request_performance.call_count, 6)
+        self.assertEqual(
+            [(message['type'], message.get('stream'),
+              message.get('record', {}).get('campaignId'))
+             for message in messages if message.get('stream') != 'campaign'],
+            [('RECORD', 'campaign_performance', 'c0')] * 3
+            + [('STATE', None, None)]
+            + [('RECORD', 'campaign_performance', 'c1')] * 3
+            + [('STATE', None, None)])
+
+        first_state = messages[2 + 3]['value']['campaign_performance']
+        last_c0_record = messages[2 + 2]['record']
+        self.assertEqual(first_state['c0'], last_c0_record['fromDate'])
+        self.assertEqual(messages[-1]['value'], state)
+
+
+if __name__ == '__main__':
+    unittest.main()